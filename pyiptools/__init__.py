@@ -1,9 +1,29 @@
+# -*- coding: utf-8 -*-
+
+import sys
 
 from pyiptools.core import *
+from pyiptools.acl import ACL, ipv4_pattern_octet_sets
+from pyiptools.ipam import IPAllocator
 
 __all__ = [
-    'IPV4', 'CIDR', 'is_string_ipv4', 'is_string_ipv6', 'ipv4_format',
-    'convert_to_ipv4', 'is_ipv4_in_range', 'is_ip_in_subnet', 'is_private_ipv4',
-    'cidr_mask_to_ip_int', 'cidr_mask_to_subnet_mask',
-    'subnet_mask_to_cidr_mask', 'ping'
-]
\ No newline at end of file
+    'IPV4', 'CIDR', 'CIDRv6', 'parse_cidr', 'IPKey', 'ip_key',
+    'is_string_ipv4', 'is_string_ipv6', 'ipv4_format', 'ipv6_format',
+    'convert_to_ipv4', 'convert_to_ipv6',
+    'is_ipv4_in_range', 'is_ip_in_subnet', 'is_private_ipv4',
+    'cidr_mask_to_ip_int', 'ipv6_mask_to_int', 'cidr_mask_to_subnet_mask',
+    'subnet_mask_to_cidr_mask', 'expand_to_file', 'ping',
+    'IPAllocator', 'ACL', 'ipv4_pattern_octet_sets'
+]
+
+# IPv4Array 的切片视图依赖 memoryview
+if sys.version_info[0] >= 3:
+    from pyiptools.ipv4array import IPv4Array
+
+    __all__ += ['IPv4Array']
+
+# probe 使用了异步生成器，需要 Python 3.6+
+if sys.version_info >= (3, 6):
+    from pyiptools.probe import ProbeResult, tcp_probe, tcp_ping
+
+    __all__ += ['ProbeResult', 'tcp_probe', 'tcp_ping']
\ No newline at end of file
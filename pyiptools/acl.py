@@ -0,0 +1,229 @@
+# -*- coding: utf-8 -*-
+"""
+有序访问控制列表(ACL)的编译与首条匹配求值
+"""
+
+from __future__ import unicode_literals
+
+import binascii
+
+import six
+from six.moves import range
+
+from pyiptools.core import CIDR, is_string_ipv4, ipv4_format
+
+# 匹配全部取值的单字节集合
+_ALL = (1 << 256) - 1
+_octet_set_cache = {}
+_octet_values_cache = {}
+
+
+def _masked_octet_set(value, care):
+    """
+    满足 v & care == value & care 的字节取值集合，以256位整数表示
+    """
+    key = (value & care, care)
+    try:
+        return _octet_set_cache[key]
+    except KeyError:
+        bits = 0
+        for v in range(256):
+            if v & care == key[0]:
+                bits |= 1 << v
+        _octet_set_cache[key] = bits
+        return bits
+
+
+def _octet_values(octet_set):
+    try:
+        return _octet_values_cache[octet_set]
+    except KeyError:
+        values = [v for v in range(256) if octet_set >> v & 1]
+        _octet_values_cache[octet_set] = values
+        return values
+
+
+def _indices_to_bits(indices):
+    """
+    规则序号列表转换为位图整数
+    """
+    if not indices:
+        return 0
+    buf = bytearray(indices[-1] // 8 + 1)
+    for i in indices:
+        buf[i >> 3] |= 1 << (i & 7)
+    buf.reverse()
+    return int(binascii.hexlify(buf), 16)
+
+
+def _range_octet_set(seg):
+    if seg == '*':
+        return _ALL
+    low, _, high = seg.partition('-')
+    low, high = int(low), int(high or low)
+    if not 0 <= low <= high <= 255:
+        raise ValueError('%s is not a valid range.' % seg)
+    return ((1 << (high + 1)) - 1) ^ ((1 << low) - 1)
+
+
+def _octets(ip_int):
+    return [ip_int >> 24, ip_int >> 16 & 0xff, ip_int >> 8 & 0xff,
+            ip_int & 0xff]
+
+
+def ipv4_pattern_octet_sets(pattern):
+    """
+    将地址匹配模式转换为每个字节的取值集合
+
+    :param pattern: 地址匹配模式
+
+        * any: 任意地址
+        * CIDR对象或 10.0.0.0/8
+        * 10.0.0.1 或 host 10.0.0.1: 单个地址
+        * 10.0.0.0 0.0.255.255: 地址与通配符掩码，允许不连续的掩码
+        * 10.25-32.*.*: 与 ``is_ipv4_in_range`` 相同的范围形式
+    :return: 4个256位整数的元组，第i位为1表示该字节可以取值i
+    """
+    if isinstance(pattern, CIDR):
+        pattern = '%s/%s' % (pattern.ip, pattern.mask_code)
+    pattern = ' '.join(pattern.split()).lower()
+    if pattern == 'any':
+        return (_ALL,) * 4
+    if pattern.startswith('host '):
+        pattern = pattern[5:]
+
+    if '/' in pattern:
+        cidr = CIDR(pattern)
+        mask_int = ((1 << cidr.mask_code) - 1) << (32 - cidr.mask_code)
+        return tuple(_masked_octet_set(v, care) for v, care in
+                     zip(_octets(ipv4_format(cidr.ip, ftype='int')),
+                         _octets(mask_int)))
+    if ' ' in pattern:
+        ip, wildcard = pattern.split(' ')
+        return tuple(_masked_octet_set(v, care ^ 0xff) for v, care in
+                     zip(_octets(ipv4_format(ip, ftype='int')),
+                         _octets(ipv4_format(wildcard, ftype='int'))))
+    if is_string_ipv4(pattern)[0]:
+        return tuple(1 << v for v in
+                     _octets(ipv4_format(pattern, ftype='int')))
+
+    segs = pattern.split('.')
+    if len(segs) != 4:
+        raise ValueError('%s is not a valid pattern.' % pattern)
+    return tuple(_range_octet_set(seg) for seg in segs)
+
+
+class ACL(object):
+    """
+    编译后的有序ACL，按首条匹配的语义求值
+
+    每条规则为 (动作, 源地址模式, 目的地址模式)，地址模式见
+    ``ipv4_pattern_octet_sets``。编译时为源、目的地址的每个字节建立
+    取值 -> 规则位图 的查找表，求值时只需8次查表和按位与，
+    取最低位即为首条命中的规则，与规则数量基本无关
+
+    用法::
+
+        acl = ACL([
+            ('deny', '10.1.0.0 0.0.255.255', 'any'),
+            ('permit', '10.0.0.0/8', '192.168.1-5.*'),
+        ], default='deny')
+        acl.evaluate('10.2.0.1', '192.168.3.10')  # 'permit'
+    """
+    def __init__(self, rules, default=None):
+        """
+        :param rules: 有序的规则列表
+        :param default: 没有规则命中时的动作
+        """
+        self.rules = list(rules)
+        self.default = default
+        self._actions = []
+        self._fields = []
+        # 每个字段: 匹配任意取值的规则序号，以及 取值 -> 规则序号列表
+        any_rules = [[] for _ in range(8)]
+        value_rules = [[[] for _ in range(256)] for _ in range(8)]
+        for index, (action, src, dst) in enumerate(self.rules):
+            fields = (ipv4_pattern_octet_sets(src) +
+                      ipv4_pattern_octet_sets(dst))
+            self._actions.append(action)
+            self._fields.append(fields)
+            for field, octet_set in enumerate(fields):
+                if octet_set == _ALL:
+                    any_rules[field].append(index)
+                    continue
+                for v in _octet_values(octet_set):
+                    value_rules[field][v].append(index)
+
+        self._tables = []
+        for field in range(8):
+            any_bits = _indices_to_bits(any_rules[field])
+            self._tables.append([any_bits | _indices_to_bits(indices)
+                                 for indices in value_rules[field]])
+
+    def match(self, src, dst):
+        """
+        首条命中的规则序号
+
+        :param src: 源地址，十进制点分ipv4地址或整数值
+        :param dst: 目的地址，十进制点分ipv4地址或整数值
+        :return: 规则在列表中的序号，没有命中时为None
+        """
+        if isinstance(src, six.string_types):
+            src = ipv4_format(src, ftype='int')
+        if isinstance(dst, six.string_types):
+            dst = ipv4_format(dst, ftype='int')
+        t = self._tables
+        bits = (t[0][src >> 24] & t[1][src >> 16 & 0xff] &
+                t[2][src >> 8 & 0xff] & t[3][src & 0xff] &
+                t[4][dst >> 24] & t[5][dst >> 16 & 0xff] &
+                t[6][dst >> 8 & 0xff] & t[7][dst & 0xff])
+        if not bits:
+            return None
+        return (bits & -bits).bit_length() - 1
+
+    def evaluate(self, src, dst):
+        """
+        对一条流求值，参数见 ``match``
+
+        :return: 首条命中规则的动作，没有命中时为 ``default``
+        """
+        index = self.match(src, dst)
+        if index is None:
+            return self.default
+        return self._actions[index]
+
+    def analyze(self):
+        """
+        逐对检查规则，找出永远不会生效或可以删除的规则
+
+        :return: 一个字典
+
+            * shadowed: [(j, i), ...]，规则j被前面动作不同的规则i完全覆盖
+            * redundant: [(j, i), ...]，规则j被前面动作相同的规则i完全覆盖，
+              或被后面动作相同的规则i完全覆盖且中间没有与j相交的不同动作规则
+        """
+        def covers(a, b):
+            return all(x & y == y for x, y in zip(a, b))
+
+        def overlaps(a, b):
+            return all(x & y for x, y in zip(a, b))
+
+        shadowed, redundant = [], []
+        fields, actions = self._fields, self._actions
+        for j in range(len(fields)):
+            for i in range(j):
+                if covers(fields[i], fields[j]):
+                    if actions[i] == actions[j]:
+                        redundant.append((j, i))
+                    else:
+                        shadowed.append((j, i))
+                    break
+            else:
+                for k in range(j + 1, len(fields)):
+                    if actions[k] != actions[j]:
+                        if overlaps(fields[k], fields[j]):
+                            break
+                    elif covers(fields[k], fields[j]):
+                        redundant.append((j, k))
+                        break
+        return {'shadowed': shadowed, 'redundant': redundant}
@@ -2,6 +2,12 @@
 
 from __future__ import unicode_literals
 
+import io
+from collections import namedtuple
+
+import six
+from six.moves import range
+
 from pyiptools.utils import int, IS_WIN, run_cmd
 
 
@@ -11,6 +17,14 @@ private_ipv4_classes = (
     '192.168.0.0/16',
 )
 
+# expand_to_file 支持的输出格式: fmt -> 每8位的格式化方式
+expand_formats = {
+    'dotted': 'd',
+    'hex': '02x',
+    'binary': '08b',
+    'int': None,
+}
+
 
 class IPV4(object):
     """
@@ -83,9 +97,41 @@ class CIDR(object):
         或：
         cidr = CIDR('10.10.10.10/255.255.0.0')
     """
+    version = 4
+
     def __init__(self, ip_mask):
         self.ip, self.mask_code = self.check(ip_mask)
 
+    def __contains__(self, ip):
+        """
+        判断ip或子网是否在该网段中，如 ``'10.0.0.1' in cidr``
+
+        :param ip: 十进制点分ipv4地址、32位整数值、``ip_key`` 返回的
+            IPKey 或CIDR对象，其他地址族恒为False
+        """
+        if isinstance(ip, CIDR):
+            return (ip.mask_code >= self.mask_code and
+                    ip._match_key[1] & self._match_key[0] ==
+                    self._match_key[1])
+        ip = _ip_int_of_version(ip, 4)
+        if ip is None:
+            return False
+        mask_int, subnet_int = self._match_key
+        return ip & mask_int == subnet_int
+
+    @property
+    def _match_key(self):
+        """
+        整数形式的 (掩码, 子网)，用于匹配
+        """
+        try:
+            return self._mask_subnet
+        except AttributeError:
+            mask_int = ((1 << self.mask_code) - 1) << (32 - self.mask_code)
+            self._mask_subnet = (
+                mask_int, ipv4_format(self.ip, ftype='int') & mask_int)
+            return self._mask_subnet
+
     @staticmethod
     def check(ip_mask):
         sub_net_ip, mask = ip_mask.split('/')
@@ -181,6 +227,256 @@ class CIDR(object):
             _next_int = _next_int + 1
 
 
+class _IPv6AddressView(object):
+    """
+    ipv6地址的惰性序列，支持 len、索引、切片、迭代和 in
+    """
+    __slots__ = ('_start', '_size', '_step')
+
+    def __init__(self, start, size, step=1):
+        self._start, self._size, self._step = start, size, step
+
+    @property
+    def size(self):
+        """
+        地址数量，对任意大小的网段都可用
+        """
+        return self._size
+
+    def __len__(self):
+        """
+        仅适用于较小的视图，地址数超出 ``sys.maxsize`` (如 /64 及更大的网段)
+        时会抛出 OverflowError，此时请使用 ``size``
+        """
+        return self._size
+
+    def __bool__(self):
+        return self._size > 0
+
+    __nonzero__ = __bool__
+
+    def _slice_indices(self, index):
+        """
+        同 ``slice.indices``，Python2 中后者不支持超出C long的长度
+        """
+        step = 1 if index.step is None else index.step
+        if step == 0:
+            raise ValueError('slice step cannot be zero')
+        lower, upper = (0, self._size) if step > 0 else (-1, self._size - 1)
+
+        def clamp(value, default):
+            if value is None:
+                return default
+            if value < 0:
+                value += self._size
+            return min(max(value, lower), upper)
+
+        return (clamp(index.start, lower if step > 0 else upper),
+                clamp(index.stop, upper if step > 0 else lower), step)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = self._slice_indices(index)
+            size = max(0, (stop - start + step - (1 if step > 0 else -1)) //
+                       step)
+            return _IPv6AddressView(self._start + start * self._step, size,
+                                    step * self._step)
+        if index < 0:
+            index += self._size
+        if not 0 <= index < self._size:
+            raise IndexError('address index out of range')
+        return convert_to_ipv6(self._start + index * self._step)
+
+    def __iter__(self):
+        # 不使用 range: Python2 的 xrange 无法表示超出C long的地址数
+        value, count = self._start, 0
+        while count < self._size:
+            yield convert_to_ipv6(value)
+            value += self._step
+            count += 1
+
+    def __contains__(self, ip):
+        ip = _ip_int_of_version(ip, 6)
+        if ip is None:
+            return False
+        offset = ip - self._start
+        return (offset % self._step == 0 and
+                0 <= offset // self._step < self._size)
+
+
+class CIDRv6(object):
+    """
+    ipv6的CIDR，内部以128位整数存储
+
+    初始化::
+
+        cidr = CIDRv6('2001:db8::1/32')
+
+    与 ``CIDR`` 保持一致: ``broadcast`` 为网段的最后一个地址,
+    ``first_ip_address`` 与 ``last_ip_address`` 不含首尾两个地址
+    """
+    __slots__ = ('_ip', 'mask_code', '_mask', '_network')
+
+    version = 6
+
+    def __init__(self, ip_mask):
+        self._ip, self.mask_code = self.check(ip_mask)
+        self._mask = ipv6_mask_to_int(self.mask_code)
+        self._network = self._ip & self._mask
+
+    @staticmethod
+    def check(ip_mask):
+        ip, _, mask = ip_mask.partition('/')
+        try:
+            mask_code = int(mask)
+        except ValueError:
+            raise ValueError('%s is not a valid cidr.' % ip_mask)
+        if 0 <= mask_code <= 128:
+            return ipv6_format(ip, ftype='int'), mask_code
+        raise ValueError('%s is not a valid cidr.' % ip_mask)
+
+    def __contains__(self, ip):
+        """
+        判断ip或子网是否在该网段中，如 ``'2001:db8::1' in cidr``
+
+        :param ip: ipv6地址、128位整数值、``ip_key`` 返回的
+            IPKey 或CIDRv6对象，其他地址族恒为False
+        """
+        if isinstance(ip, CIDRv6):
+            return (ip.mask_code >= self.mask_code and
+                    ip._network & self._mask == self._network)
+        ip = _ip_int_of_version(ip, 6)
+        if ip is None:
+            return False
+        return ip & self._mask == self._network
+
+    @property
+    def ip(self):
+        """
+        初始化时的ip
+        """
+        return convert_to_ipv6(self._ip)
+
+    @property
+    def subnet(self):
+        """
+        子网络
+        """
+        return convert_to_ipv6(self._network)
+
+    @property
+    def subnet_mask(self):
+        """
+        子网掩码
+        """
+        return convert_to_ipv6(self._mask)
+
+    @property
+    def first_ip_address(self):
+        """
+        第一个可用的ip
+        """
+        return convert_to_ipv6(self._network + 1)
+
+    @property
+    def last_ip_address(self):
+        """
+        最后一个可用的ip
+        """
+        return convert_to_ipv6(self._broadcast - 1)
+
+    @property
+    def broadcast(self):
+        """
+        网段的最后一个地址
+        """
+        return convert_to_ipv6(self._broadcast)
+
+    @property
+    def _broadcast(self):
+        return self._network | (self._mask ^ ((1 << 128) - 1))
+
+    @property
+    def ip_list(self):
+        """
+        IP列表, 返回一个惰性的地址序列，不会展开全部地址
+        """
+        return _IPv6AddressView(self._network, 1 << (128 - self.mask_code))
+
+    def subnets(self, mask_code):
+        """
+        按更长的掩码拆分为子网
+
+        :param mask_code: 子网的掩码位数，不小于当前掩码位数
+        :return: 一个CIDRv6 generator
+        """
+        mask_code = int(mask_code)
+        if not self.mask_code <= mask_code <= 128:
+            raise ValueError('%s is not a valid cidr code.' % mask_code)
+        step = 1 << (128 - mask_code)
+        network, end = self._network, self._broadcast
+        while network <= end:
+            yield CIDRv6('%s/%s' % (convert_to_ipv6(network), mask_code))
+            network += step
+
+
+class IPKey(namedtuple('IPKey', ['version', 'value'])):
+    """
+    ``ip_key`` 的返回值: (地址族, 整数值)
+    """
+    __slots__ = ()
+
+
+def _ip_int_of_version(ip, version):
+    """
+    转换为指定地址族的整数值，不属于该地址族时返回None
+    """
+    if isinstance(ip, IPKey):
+        if ip.version != version:
+            return None
+        ip = ip.value
+    elif isinstance(ip, (list, tuple)):
+        # 与 IPV4 一致，接受ipv4的4段整数列表
+        if version != 4 or len(ip) != 4:
+            return None
+        return ipv4_format('.'.join([str(i) for i in ip]), ftype='int')
+    elif isinstance(ip, six.string_types):
+        if (':' in ip) != (version == 6):
+            return None
+        if version == 4:
+            return ipv4_format(ip, ftype='int')
+        return ipv6_format(ip, ftype='int')
+    if (not isinstance(ip, six.integer_types) or
+            not 0 <= ip < 1 << (32 if version == 4 else 128)):
+        return None
+    return ip
+
+
+def ip_key(ip_str):
+    """
+    ipv4或ipv6地址转换为 (地址族, 整数值)，用于在ipv4、ipv6混合的网段表中
+    按整数匹配，避免不同地址族的整数值相互误判
+
+    :param ip_str: ipv4或ipv6地址
+    :return: 一个IPKey，如 IPKey(version=4, value=167772161)
+    """
+    if ':' in ip_str:
+        return IPKey(6, ipv6_format(ip_str, ftype='int'))
+    return IPKey(4, ipv4_format(ip_str, ftype='int'))
+
+
+def parse_cidr(ip_mask):
+    """
+    按地址类型解析CIDR
+
+    :param ip_mask: 如 '10.0.0.0/8' 或 '2001:db8::/32'
+    :return: CIDR 或 CIDRv6 对象
+    """
+    if ':' in ip_mask:
+        return CIDRv6(ip_mask)
+    return CIDR(ip_mask)
+
+
 def is_string_ipv4(string):
     """
     判断一个字符串是否符合ipv4地址规则
@@ -387,14 +683,83 @@ def convert_to_ipv4(source, stype='d'):
         raise ValueError('invalid ftype arg: %s' % stype)
 
 
+def ipv6_format(ipv6_str, ftype='int'):
+    """
+    ipv6格式化转换
+
+    :param ipv6_str: ipv6地址，支持 '::' 压缩和内嵌ipv4的形式
+    :param ftype: 格式化后值的类型
+
+        * int: 一个整数
+        * full: 不压缩的完整形式，如 2001:0db8:0000:0000:0000:0000:0000:0001
+    :return: 格式化后的值
+    """
+    check = is_string_ipv6(ipv6_str)
+    if not check[0]:
+        raise ValueError('%s not a normal IPv6.' % ipv6_str)
+    string, tail = check[1], []
+    if '.' in string:
+        string, _, ipv4_str = string.rpartition(':')
+        if string.endswith(':'):
+            string += ':'
+        ipv4_int = ipv4_format(ipv4_str, ftype='int')
+        tail = [ipv4_int >> 16, ipv4_int & 0xffff]
+    if '::' in string:
+        left, right = [seg.split(':') if seg else []
+                       for seg in string.split('::')]
+        groups = left + ['0'] * (8 - len(tail) - len(left) - len(right)) + right
+    else:
+        groups = string.split(':')
+    groups = [int(seg, base=16) for seg in groups] + tail
+    if len(groups) != 8:
+        raise ValueError('%s not a normal IPv6.' % ipv6_str)
+
+    value = 0
+    for seg in groups:
+        value = value << 16 | seg
+    if ftype == 'int':
+        return value
+    elif ftype == 'full':
+        return ':'.join(format(seg, '04x') for seg in groups)
+    raise ValueError('ftype: %s not support' % ftype)
+
+
+def convert_to_ipv6(source):
+    """
+    整数转换为ipv6地址，按 RFC 5952 压缩最长的连续0段
+
+    :param source: 一个整数
+    :return: ipv6字符串，如 2001:db8::1
+    """
+    source = int(source)
+    if not 0 <= source < 1 << 128:
+        raise ValueError('invalid ipv6 for source: %s' % source)
+    groups = [format(source >> (112 - 16 * i) & 0xffff, 'x') for i in range(8)]
+
+    best_start, best_len, start = -1, 1, None
+    for i, seg in enumerate(groups + ['end']):
+        if seg == '0':
+            start = i if start is None else start
+            continue
+        if start is not None and i - start > best_len:
+            best_start, best_len = start, i - start
+        start = None
+    if best_start < 0:
+        return ':'.join(groups)
+    return (':'.join(groups[:best_start]) + '::' +
+            ':'.join(groups[best_start + best_len:]))
+
+
 def is_ip_in_subnet(ipv4_str, subnet_str):
     """
     判断ip是否在子网中
 
-    :param ipv4_str: 一个十进制点分ipv4地址
-    :param subnet_str: 10.10.10.10/16
+    :param ipv4_str: 一个十进制点分ipv4地址或ipv6地址
+    :param subnet_str: 10.10.10.10/16 或 2001:db8::/32
     :return:
     """
+    if ':' in subnet_str:
+        return ipv4_str in CIDRv6(subnet_str)
     cidr = CIDR(subnet_str)
     sub_net_ip, mask_code = cidr.ip, cidr.mask_code
     res = (ipv4_format(ipv4_str, ftype='int') &
@@ -432,6 +797,19 @@ def cidr_mask_to_ip_int(mask_num):
     raise ValueError('% is not valid cidr code.' % cidr_num)
 
 
+def ipv6_mask_to_int(mask_num):
+    """
+    ipv6掩码位数转换为整数值
+
+    :param mask_num: 掩码位数, 如 64
+    :return: 一个整数值
+    """
+    mask_num = int(mask_num)
+    if 0 <= mask_num <= 128:
+        return ((1 << mask_num) - 1) << (128 - mask_num)
+    raise ValueError('%s is not valid cidr code.' % mask_num)
+
+
 def cidr_mask_to_subnet_mask(mask_num):
     """
     掩码位数转换为点分掩码
@@ -456,6 +834,80 @@ def subnet_mask_to_cidr_mask(subnet_mask):
     return len(cidr_mask)
 
 
+def _ipv4_segment_table(fmt):
+    return [format(i, expand_formats[fmt]) for i in range(256)]
+
+
+def _render_ipv4_range(start, end, fmt, separator):
+    """
+    将闭区间 [start, end] 内的整数ip渲染为多行文本
+
+    点分类格式以 /24 为单位，复用前三段的前缀，只对最后一段查表拼接
+    """
+    if fmt == 'int':
+        return '\n'.join(map(str, range(start, end + 1))) + '\n'
+
+    table = _ipv4_segment_table(fmt)
+    parts = []
+    block = start - (start & 0xff)
+    while block <= end:
+        lo = max(start, block) & 0xff
+        hi = min(end, block + 0xff) & 0xff
+        prefix = separator.join((table[block >> 24],
+                                 table[block >> 16 & 0xff],
+                                 table[block >> 8 & 0xff])) + separator
+        parts.append(prefix)
+        parts.append(('\n' + prefix).join(table[lo:hi + 1]))
+        parts.append('\n')
+        block += 256
+    return ''.join(parts)
+
+
+def expand_to_file(cidrs, path, fmt='dotted', **kwargs):
+    """
+    将CIDR中的全部ip逐行写入文件，适用于大网段的导出
+
+    与 ``CIDR.ip_list`` 不同，不逐个生成并校验ip字符串，而是按块直接由整数渲染
+    文本并批量写入，内存占用与网段大小无关
+
+    :param cidrs: 一个CIDR对象或 '10.0.0.0/8' 形式的字符串，或它们的列表
+    :param path: 输出文件路径
+    :param fmt: 输出格式
+
+        * dotted: 十进制点分，如 10.0.0.1
+        * int: 一个十进制整数
+        * hex: 十六进制，如 0a.00.00.01
+        * binary: 二进制，如 00001010.00000000.00000000.00000001
+    :param kwargs:
+        * separator: hex、binary 格式的分隔符，默认为 '.'
+        * chunk_size: 每次批量写入的ip数，默认为 65536
+    :return: 写入的行数
+    """
+    if fmt not in expand_formats:
+        raise ValueError('fmt: %s not support' % fmt)
+    separator = '.' if fmt == 'dotted' else kwargs.get('separator', '.')
+    chunk_size = int(kwargs.get('chunk_size', 1 << 16))
+    if chunk_size < 1:
+        raise ValueError('chunk_size must be positive')
+
+    if isinstance(cidrs, (CIDR, six.string_types)):
+        cidrs = [cidrs]
+    ranges = []
+    for cidr in cidrs:
+        if not isinstance(cidr, CIDR):
+            cidr = CIDR(cidr)
+        ranges.append((ipv4_format(cidr.subnet, ftype='int'),
+                       ipv4_format(cidr.broadcast, ftype='int')))
+
+    count = sum(last - first + 1 for first, last in ranges)
+    with io.open(path, 'w', encoding='ascii', newline='\n') as f:
+        for first, last in ranges:
+            for start in range(first, last + 1, chunk_size):
+                f.write(_render_ipv4_range(
+                    start, min(start + chunk_size - 1, last), fmt, separator))
+    return count
+
+
 def ping(host, **kwargs):
     """
     对host执行ping，获取结果
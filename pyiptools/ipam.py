@@ -0,0 +1,217 @@
+# -*- coding: utf-8 -*-
+"""
+基于伙伴系统(buddy system)的ipv4地址块分配
+"""
+
+from __future__ import unicode_literals
+
+import heapq
+import json
+
+import six
+
+from pyiptools.core import CIDR, convert_to_ipv4, ipv4_format
+
+
+class IPAllocator(object):
+    """
+    从一组CIDR地址池中分配对齐的地址块
+
+    空闲块按掩码位数分组保存，分配时拆分更大的空闲块，释放时与空闲的伙伴块合并，
+    每次操作的代价为 O(log n)
+
+    用法::
+
+        allocator = IPAllocator(['10.0.0.0/16'])
+        cidr = allocator.allocate(24)
+        allocator.release(cidr)
+    """
+    def __init__(self, pools=()):
+        self._pools = []
+        # 掩码位数 -> 空闲块起始地址集合，以及用于取最小地址的堆(延迟删除)
+        self._free = dict((i, set()) for i in range(33))
+        self._heaps = dict((i, []) for i in range(33))
+        # 已分配块的起始地址 -> 掩码位数
+        self._allocated = {}
+        self._total = self._used = 0
+        for pool in pools:
+            self.add_pool(pool)
+
+    @staticmethod
+    def _to_block(cidr):
+        if not isinstance(cidr, CIDR):
+            cidr = CIDR(cidr)
+        return ipv4_format(cidr.subnet, ftype='int'), cidr.mask_code
+
+    @staticmethod
+    def _to_cidr(start, mask_code):
+        return CIDR('%s/%s' % (convert_to_ipv4(start, stype='int'), mask_code))
+
+    def _push(self, start, mask_code):
+        self._free[mask_code].add(start)
+        heap = self._heaps[mask_code]
+        heapq.heappush(heap, start)
+        if len(heap) > 2 * len(self._free[mask_code]) + 64:
+            heap[:] = sorted(self._free[mask_code])
+
+    def _pop(self, mask_code):
+        free, heap = self._free[mask_code], self._heaps[mask_code]
+        while True:
+            start = heapq.heappop(heap)
+            if start in free:
+                free.remove(start)
+                return start
+
+    def add_pool(self, pool):
+        """
+        添加一个地址池
+
+        :param pool: CIDR对象或 '10.0.0.0/16' 形式的字符串
+        """
+        start, mask_code = self._to_block(pool)
+        end = start + (1 << (32 - mask_code))
+        for _start, _mask_code in map(self._to_block, self._pools):
+            if start < _start + (1 << (32 - _mask_code)) and _start < end:
+                raise ValueError('%s overlaps an existing pool.' % pool)
+        self._pools.append('%s/%s' % (convert_to_ipv4(start, stype='int'),
+                                      mask_code))
+        self._total += end - start
+        self._release_block(start, mask_code)
+
+    def allocate(self, mask_code):
+        """
+        分配一个指定大小的地址块，优先返回地址最小的块
+
+        :param mask_code: 掩码位数, 如 24
+        :return: 一个CIDR对象
+        """
+        mask_code = int(mask_code)
+        if not 0 <= mask_code <= 32:
+            raise ValueError('%s is not valid cidr code.' % mask_code)
+        for level in range(mask_code, -1, -1):
+            if self._free[level]:
+                break
+        else:
+            raise ValueError('no free block for /%s.' % mask_code)
+
+        start = self._pop(level)
+        while level < mask_code:
+            level += 1
+            self._push(start + (1 << (32 - level)), level)
+        self._mark_allocated(start, mask_code)
+        return self._to_cidr(start, mask_code)
+
+    def allocate_specific(self, cidr):
+        """
+        分配一个指定的地址块
+
+        :param cidr: CIDR对象或 '10.0.1.0/24' 形式的字符串
+        :return: 一个CIDR对象
+        """
+        start, mask_code = self._to_block(cidr)
+        for level in range(mask_code, -1, -1):
+            block = start & (((1 << level) - 1) << (32 - level))
+            if block in self._free[level]:
+                break
+        else:
+            raise ValueError('%s is not free.' % cidr)
+
+        self._free[level].remove(block)
+        while level < mask_code:
+            level += 1
+            half = 1 << (32 - level)
+            if start & half:
+                self._push(block, level)
+                block += half
+            else:
+                self._push(block + half, level)
+        self._mark_allocated(start, mask_code)
+        return self._to_cidr(start, mask_code)
+
+    def release(self, cidr):
+        """
+        释放一个已分配的地址块
+
+        :param cidr: CIDR对象或 '10.0.1.0/24' 形式的字符串
+        """
+        start, mask_code = self._to_block(cidr)
+        if self._allocated.get(start) != mask_code:
+            raise ValueError('%s is not allocated.' % cidr)
+        del self._allocated[start]
+        self._used -= 1 << (32 - mask_code)
+        self._release_block(start, mask_code)
+
+    def _mark_allocated(self, start, mask_code):
+        self._allocated[start] = mask_code
+        self._used += 1 << (32 - mask_code)
+
+    def _release_block(self, start, mask_code):
+        while mask_code > 0:
+            buddy = start ^ (1 << (32 - mask_code))
+            if buddy not in self._free[mask_code]:
+                break
+            self._free[mask_code].remove(buddy)
+            start = min(start, buddy)
+            mask_code -= 1
+        self._push(start, mask_code)
+
+    @property
+    def allocations(self):
+        """
+        已分配的地址块列表，按地址排序
+        """
+        return ['%s/%s' % (convert_to_ipv4(start, stype='int'),
+                           self._allocated[start])
+                for start in sorted(self._allocated)]
+
+    def report(self):
+        """
+        使用率与碎片化报告
+
+        :return: 一个字典
+
+            * total: 地址池中的地址总数
+            * allocated: 已分配的地址数
+            * free: 空闲的地址数
+            * utilization: 使用率，0~1
+            * largest_free: 最大空闲块的掩码位数，无空闲时为None
+            * fragmentation: 碎片率，1 - 最大空闲块大小/空闲地址数，0~1
+            * free_blocks: 掩码位数 -> 空闲块数量
+        """
+        free = self._total - self._used
+        utilization = float(self._used) / self._total if self._total else 0.0
+        free_blocks = dict((level, len(starts))
+                           for level, starts in six.iteritems(self._free)
+                           if starts)
+        largest = min(free_blocks) if free_blocks else None
+        return {
+            'total': self._total,
+            'allocated': self._used,
+            'free': free,
+            'utilization': utilization,
+            'largest_free': largest,
+            'fragmentation': (1 - float(1 << (32 - largest)) / free
+                              if free else 0.0),
+            'free_blocks': free_blocks,
+        }
+
+    def snapshot(self):
+        """
+        导出为JSON字符串，可通过 ``restore`` 恢复
+        """
+        return json.dumps({'pools': self._pools,
+                           'allocations': self.allocations})
+
+    @classmethod
+    def restore(cls, snapshot):
+        """
+        从 ``snapshot`` 导出的JSON字符串恢复
+
+        :param snapshot: JSON字符串
+        :return: 一个IPAllocator对象
+        """
+        data = json.loads(snapshot)
+        allocator = cls(data['pools'])
+        for cidr in data['allocations']:
+            allocator.allocate_specific(cidr)
+        return allocator
@@ -0,0 +1,223 @@
+# -*- coding: utf-8 -*-
+"""
+以32位整数紧凑存储大量ipv4地址的容器
+
+安装了NumPy时使用 ``numpy.uint32`` 数组，否则使用标准库的 ``array``，
+切片视图依赖 ``memoryview``，仅支持Python3
+"""
+
+from __future__ import unicode_literals
+
+from array import array
+from collections import Counter
+
+import six
+from six.moves import range
+
+from pyiptools.core import CIDR, convert_to_ipv4, ipv4_format
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 4字节无符号整数的 typecode
+typecode = 'I' if array('I').itemsize == 4 else 'L'
+
+
+def _int_to_ipv4(value):
+    return '%d.%d.%d.%d' % (value >> 24, value >> 16 & 0xff,
+                            value >> 8 & 0xff, value & 0xff)
+
+
+def _use_numpy(kwargs):
+    use_numpy = kwargs.get('use_numpy', np is not None)
+    if use_numpy and np is None:
+        raise ImportError('numpy is required for use_numpy=True')
+    return use_numpy
+
+
+def _to_int(ip):
+    if isinstance(ip, six.integer_types):
+        return ip
+    return ipv4_format(ip, ftype='int')
+
+
+class IPv4Array(object):
+    """
+    ipv4地址数组，每个地址占用4字节
+
+    初始化::
+
+        arr = IPv4Array([167772161, 167772162])
+        arr = IPv4Array.from_strings(['10.0.0.1', '10.0.0.2'])
+        arr = IPv4Array.from_cidr('10.0.0.0/16')
+
+    索引返回整数值，切片返回共享数据的视图
+    """
+    def __init__(self, values=(), **kwargs):
+        """
+        :param values: 整数值的可迭代对象，或 array、numpy数组
+        :param kwargs:
+            * use_numpy: 是否使用NumPy，默认在可用时使用
+        """
+        if _use_numpy(kwargs):
+            if isinstance(values, (np.ndarray, array, list, tuple)):
+                self._data = np.asarray(values, dtype=np.uint32)
+            else:
+                self._data = np.fromiter(values, dtype=np.uint32)
+        else:
+            if not isinstance(values, array) or values.typecode != typecode:
+                values = array(typecode, values)
+            self._data = memoryview(values)
+
+    @classmethod
+    def _wrap(cls, data):
+        obj = cls.__new__(cls)
+        obj._data = data
+        return obj
+
+    @classmethod
+    def from_strings(cls, ip_list, **kwargs):
+        """
+        由十进制点分ipv4字符串构造
+
+        :param ip_list: ip字符串的可迭代对象
+        :return: 一个IPv4Array对象
+        """
+        return cls((ipv4_format(ip, ftype='int') for ip in ip_list), **kwargs)
+
+    @classmethod
+    def from_cidr(cls, cidr, **kwargs):
+        """
+        由CIDR中的全部ip构造
+
+        :param cidr: CIDR对象或 '10.0.0.0/16' 形式的字符串
+        :return: 一个IPv4Array对象
+        """
+        if not isinstance(cidr, CIDR):
+            cidr = CIDR(cidr)
+        first = ipv4_format(cidr.subnet, ftype='int')
+        last = ipv4_format(cidr.broadcast, ftype='int')
+        if _use_numpy(kwargs):
+            return cls(np.arange(first, last + 1, dtype=np.uint32), **kwargs)
+        return cls(range(first, last + 1), **kwargs)
+
+    @property
+    def is_numpy(self):
+        """
+        是否使用NumPy存储
+        """
+        return not isinstance(self._data, memoryview)
+
+    @property
+    def nbytes(self):
+        """
+        数据占用的字节数
+        """
+        return self._data.nbytes
+
+    def __len__(self):
+        return len(self._data)
+
+    def __iter__(self):
+        return (int(i) for i in self._data)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return self._wrap(self._data[index])
+        return int(self._data[index])
+
+    def __contains__(self, ip):
+        ip = _to_int(ip)
+        if self.is_numpy:
+            return bool((self._data == ip).any())
+        return ip in self._data
+
+    def __repr__(self):
+        return '<IPv4Array len=%s>' % len(self)
+
+    def _new(self, values):
+        if self.is_numpy:
+            return self._wrap(values)
+        return self._wrap(memoryview(array(typecode, values)))
+
+    def to_strings(self):
+        """
+        转换为十进制点分ipv4字符串
+
+        :return: 一个ip字符串 generator
+        """
+        return (_int_to_ipv4(int(i)) for i in self._data)
+
+    def sort(self):
+        """
+        原地排序，对视图排序会修改原数组的对应部分
+        """
+        if self.is_numpy:
+            self._data.sort()
+        else:
+            self._data[:] = array(typecode, sorted(self._data))
+
+    def unique(self):
+        """
+        去重
+
+        :return: 一个排好序的新IPv4Array对象
+        """
+        if self.is_numpy:
+            return self._new(np.unique(self._data))
+        return self._new(sorted(set(self._data)))
+
+    def count_by_prefix(self, mask_code):
+        """
+        按网段统计ip数量
+
+        :param mask_code: 掩码位数, 如 24
+        :return: 一个字典: 网段 -> 数量，如 {'10.0.0.0/24': 3}
+        """
+        mask_code = int(mask_code)
+        if not 0 <= mask_code <= 32:
+            raise ValueError('%s is not valid cidr code.' % mask_code)
+        mask_int = ((1 << mask_code) - 1) << (32 - mask_code)
+        if self.is_numpy:
+            keys, counts = np.unique(self._data & np.uint32(mask_int),
+                                     return_counts=True)
+            counter = zip(keys.tolist(), counts.tolist())
+        else:
+            counter = six.iteritems(
+                Counter(map(mask_int.__and__, self._data)))
+        return dict(('%s/%s' % (convert_to_ipv4(key, stype='int'), mask_code),
+                     count) for key, count in counter)
+
+    def _cidr_range(self, cidr):
+        if not isinstance(cidr, CIDR):
+            cidr = CIDR(cidr)
+        mask_int, subnet_int = cidr._match_key
+        return subnet_int, subnet_int | (mask_int ^ 0xffffffff)
+
+    def in_cidr(self, cidr):
+        """
+        筛选出在CIDR中的ip
+
+        :param cidr: CIDR对象或 '10.0.0.0/16' 形式的字符串
+        :return: 一个新的IPv4Array对象
+        """
+        first, last = self._cidr_range(cidr)
+        if self.is_numpy:
+            data = self._data
+            return self._new(data[(data >= first) & (data <= last)])
+        return self._new(i for i in self._data if first <= i <= last)
+
+    def count_in_cidr(self, cidr):
+        """
+        统计在CIDR中的ip数量
+
+        :param cidr: CIDR对象或 '10.0.0.0/16' 形式的字符串
+        :return: 一个整数
+        """
+        first, last = self._cidr_range(cidr)
+        if self.is_numpy:
+            data = self._data
+            return int(((data >= first) & (data <= last)).sum())
+        return sum(1 for i in self._data if first <= i <= last)
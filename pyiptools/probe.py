@@ -0,0 +1,158 @@
+# -*- coding: utf-8 -*-
+"""
+基于asyncio的TCP连接探测，作为 ``ping`` 的替代
+
+不依赖系统 ``ping`` 命令和ICMP权限，需要 Python 3.6+
+"""
+
+from __future__ import unicode_literals
+
+import asyncio
+import time
+from collections import namedtuple
+
+import six
+
+from pyiptools.core import CIDR
+
+
+ProbeResult = namedtuple(
+    'ProbeResult', ['host', 'port', 'reachable', 'latency', 'attempts', 'error']
+)
+ProbeResult.__doc__ = """
+探测结果
+
+* host: 目标主机
+* port: 目标端口
+* reachable: 是否成功建立TCP连接
+* latency: 建立连接的耗时(秒)，不可达时为None
+* attempts: 实际尝试的次数
+* error: 失败原因，可达时为None
+"""
+
+_done = object()
+
+
+def _iter_targets(targets, port=None):
+    ports = [port] if isinstance(port, six.integer_types) else port or []
+
+    def with_ports(host):
+        if not ports:
+            raise ValueError('port is required for target: %s' % host)
+        for _port in ports:
+            yield host, int(_port)
+
+    if isinstance(targets, (CIDR, six.string_types)):
+        targets = [targets]
+    for target in targets:
+        if isinstance(target, CIDR) or (
+                isinstance(target, six.string_types) and '/' in target):
+            cidr = target if isinstance(target, CIDR) else CIDR(target)
+            for ip in cidr.ip_list:
+                for item in with_ports(ip):
+                    yield item
+        elif isinstance(target, (list, tuple)):
+            host, _port = target
+            yield host, int(_port)
+        elif target.count(':') == 1:
+            host, _, _port = target.partition(':')
+            yield host, int(_port)
+        else:
+            for item in with_ports(target):
+                yield item
+
+
+async def _probe_one(host, port, timeout, retries):
+    loop = asyncio.get_event_loop()
+    error = None
+    for attempt in range(1, retries + 2):
+        start = time.perf_counter()
+        try:
+            transport, _ = await asyncio.wait_for(
+                loop.create_connection(asyncio.Protocol, host, port), timeout)
+        except asyncio.TimeoutError:
+            error = 'timeout'
+            continue
+        except ConnectionRefusedError as e:
+            # 对端明确拒绝，重试没有意义
+            return ProbeResult(host, port, False, None, attempt, str(e))
+        except OSError as e:
+            error = str(e)
+            continue
+        latency = time.perf_counter() - start
+        transport.abort()
+        return ProbeResult(host, port, True, latency, attempt, None)
+    return ProbeResult(host, port, False, None, retries + 1, error)
+
+
+async def tcp_probe(targets, port=None, **kwargs):
+    """
+    并发地对目标执行TCP连接探测，按完成顺序逐个产出结果
+
+    用法::
+
+        async for res in tcp_probe('10.0.0.0/24', port=22):
+            print(res.host, res.reachable, res.latency)
+
+    :param targets: 探测目标，可以是以下元素或它们的列表
+
+        * CIDR对象或 '10.0.0.0/24' 形式的字符串，需指定 ``port``
+        * 'host:port' 形式的字符串
+        * (host, port) 元组
+        * 主机名或ip，需指定 ``port``
+    :param port: 端口或端口列表，用于未携带端口的目标
+    :param kwargs:
+        * concurrency: 最大并发连接数，默认为256
+        * timeout: 每次连接的超时时间(秒)，默认为1
+        * retries: 超时或出错后的重试次数，默认为0
+    :return: 一个产出 ``ProbeResult`` 的异步生成器
+    """
+    concurrency = int(kwargs.get('concurrency', 256))
+    timeout = kwargs.get('timeout', 1.0)
+    retries = int(kwargs.get('retries', 0))
+    if concurrency < 1:
+        raise ValueError('concurrency must be positive')
+
+    pending = _iter_targets(targets, port)
+    results = asyncio.Queue(maxsize=concurrency)
+
+    async def worker():
+        try:
+            for host, _port in pending:
+                await results.put(
+                    await _probe_one(host, _port, timeout, retries))
+        except Exception as e:
+            await results.put(e)
+        await results.put(_done)
+
+    workers = [asyncio.ensure_future(worker()) for _ in range(concurrency)]
+    running = len(workers)
+    try:
+        while running:
+            res = await results.get()
+            if res is _done:
+                running -= 1
+            elif isinstance(res, Exception):
+                raise res
+            else:
+                yield res
+    finally:
+        for task in workers:
+            task.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+
+
+def tcp_ping(targets, port=None, **kwargs):
+    """
+    ``tcp_probe`` 的同步版本，参数见 ``tcp_probe``
+
+    :return: ``ProbeResult`` 列表，按完成顺序排列
+    """
+    async def collect():
+        return [res async for res in tcp_probe(targets, port, **kwargs)]
+
+    loop = asyncio.new_event_loop()
+    try:
+        return loop.run_until_complete(collect())
+    finally:
+        loop.close()
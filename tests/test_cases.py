@@ -1,5 +1,9 @@
 
 
+import sys
+
+import pytest
+
 import pyiptools
 
 
@@ -49,3 +53,216 @@ def test_is_ip_in_subnet():
 def test_is_private_ipv4():
     assert pyiptools.is_private_ipv4('172.20.5.0') is True
     assert pyiptools.is_private_ipv4('123.66.129.235') is False
+
+
+def test_expand_to_file(tmpdir):
+    path = str(tmpdir.join('ips.txt'))
+    assert pyiptools.expand_to_file('10.0.0.5/23', path) == 512
+    with open(path) as f:
+        lines = f.read().splitlines()
+    assert lines == list(pyiptools.CIDR('10.0.0.5/23').ip_list)
+
+    assert pyiptools.expand_to_file(['10.0.0.0/31', '10.0.1.255/32'], path,
+                                    fmt='hex', separator='') == 3
+    with open(path) as f:
+        assert f.read() == '0a000000\n0a000001\n0a0001ff\n'
+
+    pyiptools.expand_to_file('10.0.0.0/20', path, fmt='int',
+                             chunk_size=1000)
+    with open(path) as f:
+        assert [int(i) for i in f] == list(range(167772160, 167776256))
+
+
+@pytest.mark.skipif(sys.version_info < (3, 6),
+                    reason='tcp_ping requires Python 3.6+')
+def test_tcp_ping():
+    import socket
+
+    listener = socket.socket()
+    listener.bind(('127.0.0.1', 0))
+    listener.listen(128)
+    open_port = listener.getsockname()[1]
+
+    closed = socket.socket()
+    closed.bind(('127.0.0.1', 0))
+    closed_port = closed.getsockname()[1]
+    closed.close()
+
+    try:
+        res = pyiptools.tcp_ping(
+            ['127.0.0.1:%s' % open_port, ('127.0.0.1', closed_port)],
+            timeout=1, retries=2)
+        res = dict(((r.port, r) for r in res))
+        assert res[open_port].reachable is True
+        assert res[open_port].latency >= 0
+        assert res[closed_port].reachable is False
+        assert res[closed_port].attempts == 1
+
+        res = pyiptools.tcp_ping('127.0.0.0/30', port=open_port,
+                                 concurrency=2)
+        assert sorted(r.host for r in res if r.reachable) == ['127.0.0.1']
+    finally:
+        listener.close()
+
+
+class TestCIDRv6(object):
+    cidr_obj = pyiptools.CIDRv6('2001:db8::5/64')
+
+    def test_subnet(self):
+        assert self.cidr_obj.subnet == '2001:db8::'
+
+    def test_subnet_mask(self):
+        assert self.cidr_obj.subnet_mask == 'ffff:ffff:ffff:ffff::'
+
+    def test_first_ip_address(self):
+        assert self.cidr_obj.first_ip_address == '2001:db8::1'
+
+    def test_last_ip_address(self):
+        assert self.cidr_obj.last_ip_address == \
+               '2001:db8::ffff:ffff:ffff:fffe'
+
+    def test_broadcast(self):
+        assert self.cidr_obj.broadcast == '2001:db8::ffff:ffff:ffff:ffff'
+
+    def test_contains(self):
+        assert '2001:db8::abcd' in self.cidr_obj
+        assert '2001:db9::' not in self.cidr_obj
+        assert '10.0.0.1' not in self.cidr_obj
+        assert pyiptools.CIDRv6('2001:db8::/96') in self.cidr_obj
+
+    def test_ip_list(self):
+        ip_list = self.cidr_obj.ip_list
+        assert ip_list.size == 1 << 64
+        assert ip_list
+        assert not ip_list[5:5]
+        assert ip_list[-1] == self.cidr_obj.broadcast
+        assert list(ip_list[1:4]) == ['2001:db8::1', '2001:db8::2',
+                                      '2001:db8::3']
+        assert '2001:db8::4' in ip_list[::2]
+        it = iter(ip_list)
+        assert [next(it) for _ in range(3)] == [
+            '2001:db8::', '2001:db8::1', '2001:db8::2']
+
+    def test_subnets(self):
+        subnets = list(pyiptools.CIDRv6('2001:db8::/62').subnets(64))
+        assert [c.subnet for c in subnets] == [
+            '2001:db8::', '2001:db8:0:1::', '2001:db8:0:2::',
+            '2001:db8:0:3::']
+        first = next(pyiptools.CIDRv6('::/0').subnets(64))
+        assert (first.subnet, first.mask_code) == ('::', 64)
+
+
+def test_ipv6_format():
+    assert pyiptools.ipv6_format('::1') == 1
+    assert pyiptools.ipv6_format('::ffff:10.0.0.1') == 0xffff0a000001
+    assert pyiptools.ipv6_format('2001:db8::1', ftype='full') == \
+           '2001:0db8:0000:0000:0000:0000:0000:0001'
+
+
+def test_convert_to_ipv6():
+    assert pyiptools.convert_to_ipv6(0) == '::'
+    assert pyiptools.convert_to_ipv6(1) == '::1'
+    assert pyiptools.convert_to_ipv6(
+        pyiptools.ipv6_format('2001:0:0:1:0:0:0:1')) == '2001:0:0:1::1'
+    assert pyiptools.convert_to_ipv6(
+        pyiptools.ipv6_format('2001:db8:0:1:1:1:1:1')) == \
+        '2001:db8:0:1:1:1:1:1'
+
+
+def test_parse_cidr():
+    table = [pyiptools.parse_cidr(c) for c in
+             ('10.0.0.0/8', '2001:db8::/32', '0.0.0.0/0')]
+    assert [c.version for c in table] == [4, 6, 4]
+    assert [('10.1.2.3' in c) for c in table] == [True, False, True]
+    assert [('2001:db8::1' in c) for c in table] == [False, True, False]
+    assert pyiptools.is_ip_in_subnet('2001:db8::1', '2001:db8::/32') is True
+
+    v6_key = pyiptools.ip_key('::1')
+    assert [(v6_key in c) for c in table] == [False, False, False]
+    assert [(pyiptools.ip_key('10.0.0.1') in c) for c in table] == \
+        [True, False, True]
+    assert (1 << 100 | 1) not in pyiptools.CIDR('0.0.0.1/32')
+    assert pyiptools.IPKey(4, 1) not in pyiptools.CIDRv6('::/96')
+    assert (10, 0, 0, 1) in table[0]
+    assert (10, 0, 0, 1) not in table[1]
+
+
+def test_ip_allocator():
+    allocator = pyiptools.IPAllocator(['10.0.0.0/22'])
+    assert allocator.allocate(24).subnet == '10.0.0.0'
+    assert allocator.allocate(29).subnet == '10.0.1.0'
+    assert allocator.allocate_specific('10.0.3.0/24').subnet == '10.0.3.0'
+    assert allocator.allocate(24).subnet == '10.0.2.0'
+    with pytest.raises(ValueError):
+        allocator.allocate_specific('10.0.1.0/28')
+
+    report = allocator.report()
+    assert report['allocated'] == 3 * 256 + 8
+    assert report['free_blocks'] == {29: 1, 28: 1, 27: 1, 26: 1, 25: 1}
+
+    restored = pyiptools.IPAllocator.restore(allocator.snapshot())
+    assert restored.allocations == allocator.allocations
+
+    for cidr in allocator.allocations:
+        allocator.release(cidr)
+    report = allocator.report()
+    assert report['free_blocks'] == {22: 1}
+    assert report['utilization'] == 0
+    assert report['fragmentation'] == 0
+
+
+@pytest.mark.skipif(sys.version_info[0] < 3,
+                    reason='IPv4Array requires Python 3')
+@pytest.mark.parametrize('use_numpy', [False, True])
+def test_ipv4_array(use_numpy):
+    if use_numpy:
+        pytest.importorskip('numpy')
+    arr = pyiptools.IPv4Array.from_strings(
+        ['10.0.1.2', '10.0.0.9', '192.168.1.1', '10.0.0.9'],
+        use_numpy=use_numpy)
+    assert arr.is_numpy is use_numpy
+    assert len(arr) == 4 and arr.nbytes == 16
+    assert '10.0.0.9' in arr and '10.0.0.10' not in arr
+
+    view = arr[0:2]
+    view.sort()
+    assert list(arr.to_strings()) == ['10.0.0.9', '10.0.1.2', '192.168.1.1',
+                                      '10.0.0.9']
+    arr.sort()
+    assert list(arr.unique().to_strings()) == ['10.0.0.9', '10.0.1.2',
+                                               '192.168.1.1']
+    assert arr.count_by_prefix(24) == {'10.0.0.0/24': 2, '10.0.1.0/24': 1,
+                                       '192.168.1.0/24': 1}
+    assert list(arr.in_cidr('10.0.0.0/16').to_strings()) == [
+        '10.0.0.9', '10.0.0.9', '10.0.1.2']
+    assert arr.count_in_cidr(pyiptools.CIDR('0.0.0.0/0')) == 4
+
+    arr = pyiptools.IPv4Array.from_cidr('10.0.0.0/30', use_numpy=use_numpy)
+    assert list(arr.to_strings()) == list(
+        pyiptools.CIDR('10.0.0.0/30').ip_list)
+
+
+def test_acl():
+    acl = pyiptools.ACL([
+        ('deny', '10.1.0.0 0.0.255.255', 'any'),
+        ('permit', '10.0.0.0/8', '192.168.1-5.*'),
+        ('deny', '10.0.0.0 0.255.0.255', 'host 192.168.3.10'),
+        ('permit', 'any', '172.16.0.0 0.15.255.255'),
+        ('permit', '10.0.0.0/16', '172.20.0.0/16'),
+    ], default='deny')
+    assert acl.evaluate('10.1.2.3', '192.168.3.10') == 'deny'
+    assert acl.evaluate('10.2.0.1', '192.168.3.10') == 'permit'
+    assert acl.match('10.2.0.1', '192.168.6.1') is None
+    assert acl.evaluate('10.2.0.1', '192.168.6.1') == 'deny'
+    assert acl.evaluate('8.8.8.8', '172.31.0.1') == 'permit'
+    assert acl.evaluate(0x08080808, 0xac200001) == 'deny'
+    assert acl.analyze() == {'shadowed': [(2, 1)], 'redundant': [(4, 3)]}
+
+
+def test_ipv4_pattern_octet_sets():
+    sets = pyiptools.ipv4_pattern_octet_sets('10.0.0.0 0.0.1.254')
+    assert sets[:2] == (1 << 10, 1)
+    assert sets[2] == 0b11
+    assert sets[3] == sum(1 << v for v in range(0, 256, 2))
+    assert pyiptools.ipv4_pattern_octet_sets('10.25-32.*.*')[1] == \
+        sum(1 << v for v in range(25, 33))